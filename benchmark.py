@@ -4,28 +4,76 @@ Benchmark for comparing different concurrency models in the HTTP server simulati
 
 import time
 import os
+import gc
 import json
-import matplotlib.pyplot as plt
-from typing import List, Dict, Any
-import psutil
+import hashlib
+from typing import List, Dict, Any, Optional
 
-from master import SingleProcessMaster, ThreadedMaster, MultiprocessMaster
+from master import SingleProcessMaster, ThreadedMaster, MultiprocessMaster, configure_start_method
 from logger import Logger
 
+# Oversubscribing past this many workers only adds pool contention
+MAX_OVERSUBSCRIBED_WORKERS = 16
+
+CACHE_DIR = os.path.join("results", "cache")
+
+# Modules whose code determines the benchmark results; editing any of them invalidates the cache
+BENCHMARKED_SOURCES = ("master.py", "worker.py", "task.py", "shared_queue.py")
+
 def get_cpu_count():
     """Get the number of CPU cores."""
     return os.cpu_count() or 4
 
-def run_comprehensive_benchmark(task_counts: List[int] = None, worker_counts: List[int] = None) -> Dict[str, Any]:
-    """Run benchmarks for different models with varying task and worker counts."""
+def get_worker_counts(cpu_count: int) -> List[int]:
+    """Worker counts to benchmark, with the oversubscribed case capped and duplicates removed."""
+    return sorted({1, max(1, cpu_count // 2), cpu_count, min(cpu_count * 2, MAX_OVERSUBSCRIBED_WORKERS)})
+
+def get_code_version() -> Optional[str]:
+    """Hash the benchmarked sources, uncommitted edits included, or return None if one can't be read."""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha1()
+    try:
+        for name in BENCHMARKED_SOURCES:
+            with open(os.path.join(base_dir, name), 'rb') as f:
+                digest.update(f.read())
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+def get_cache_key(model: str, task_count: int, worker_count: int, code_version: str) -> str:
+    """Build the cache key for one benchmark configuration."""
+    return hashlib.sha1(f"{model}:{task_count}:{worker_count}:{code_version}".encode()).hexdigest()
+
+def load_cached_result(key: str) -> Optional[Dict[str, Any]]:
+    """Load a cached benchmark result, or None if the configuration hasn't been run."""
+    path = os.path.join(CACHE_DIR, f"{key}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_cached_result(key: str, result: Dict[str, Any]):
+    """Cache a benchmark result so later runs can reuse it."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(os.path.join(CACHE_DIR, f"{key}.json"), 'w') as f:
+        json.dump(result, f, indent=2)
+
+def run_comprehensive_benchmark(task_counts: List[int] = None, worker_counts: List[int] = None,
+                                force: bool = False, append_to: Optional[str] = None) -> Dict[str, Any]:
+    """Run benchmarks for different models with varying task and worker counts.
+    
+    Results are cached per configuration and code version under results/cache, and
+    cached configurations are skipped unless ``force`` is set. With ``append_to``,
+    configurations already present in that results file are skipped and new results
+    are merged into it instead of a new timestamped file.
+    """
     logger = Logger("benchmark")
     
     if task_counts is None:
         task_counts = [10, 50, 100]
         
     if worker_counts is None:
-        cpu_count = get_cpu_count()
-        worker_counts = [1, cpu_count // 2, cpu_count, cpu_count * 2]
+        worker_counts = get_worker_counts(get_cpu_count())
     
     results = {
         'single': [],
@@ -33,41 +81,87 @@ def run_comprehensive_benchmark(task_counts: List[int] = None, worker_counts: Li
         'multiprocess': []
     }
     
-    for task_count in task_counts:
-        logger.info(f"Running benchmarks with {task_count} tasks")
-        
-        # Single process benchmark (only one worker)
-        logger.info("Running single process benchmark...")
-        single = SingleProcessMaster()
-        single_result = single.run_benchmark(task_count)
-        results['single'].append(single_result)
+    if append_to and os.path.exists(append_to):
+        with open(append_to) as f:
+            results.update(json.load(f))
+    done = {(model, r['num_tasks'], r['num_workers']) for model in results for r in results[model]}
+    code_version = get_code_version()
+    if code_version is None:
+        logger.info("Benchmarked sources not found; result caching is disabled")
+    
+    def run_configs(model, worker_count, create_master):
+        """Run every task count for one model and worker count on a single master.
         
-        # Threaded and multiprocess benchmarks with varying worker counts
-        for worker_count in worker_counts:
-            logger.info(f"Running with {worker_count} workers")
+        Workers are started once and reused across task counts. Configurations that
+        are already in the results or the cache are skipped, and no master is created
+        when nothing is left to run.
+        """
+        pending = []
+        for task_count in task_counts:
+            if worker_count > task_count:
+                # More workers than tasks only adds startup and contention overhead
+                logger.info(f"Skipping {worker_count} workers for {task_count} tasks")
+                continue
+                
+            if (model, task_count, worker_count) in done:
+                logger.info(f"Skipping {model} ({task_count} tasks, {worker_count} workers): already in {append_to}")
+                continue
+                
+            # Without a code version a cached result can't be told apart from a stale one
+            key = get_cache_key(model, task_count, worker_count, code_version) if code_version else None
+            cached = None if force or key is None else load_cached_result(key)
+            if cached is not None:
+                logger.info(f"Using cached {model} result ({task_count} tasks, {worker_count} workers)")
+                results[model].append(cached)
+                continue
+                
+            pending.append((task_count, key))
             
-            # Threaded benchmark
-            logger.info("Running threaded benchmark...")
-            threaded = ThreadedMaster(worker_count)
-            threaded_result = threaded.run_benchmark(task_count)
-            results['threaded'].append(threaded_result)
+        if not pending:
+            return
             
-            # Multiprocess benchmark
-            logger.info("Running multiprocess benchmark...")
-            multiprocess = MultiprocessMaster(worker_count)
-            multiprocess_result = multiprocess.run_benchmark(task_count)
-            results['multiprocess'].append(multiprocess_result)
+        master = create_master()
+        master.start_workers()
+        try:
+            for task_count, key in pending:
+                logger.info(f"Running {model} benchmark with {task_count} tasks and {worker_count} workers...")
+                result = master.run_benchmark(task_count)
+                if key is not None:
+                    save_cached_result(key, result)
+                results[model].append(result)
+        finally:
+            master.stop_workers()
+    
+    # Single process benchmark (only one worker)
+    run_configs('single', 1, SingleProcessMaster)
+    
+    # Threaded and multiprocess benchmarks with varying worker counts
+    for worker_count in worker_counts:
+        logger.info(f"Running with {worker_count} workers")
+        run_configs('threaded', worker_count, lambda: ThreadedMaster(worker_count))
+        run_configs('multiprocess', worker_count, lambda: MultiprocessMaster(worker_count))
     
     # Save results to file
-    os.makedirs("results", exist_ok=True)
-    timestamp = time.strftime("%Y%m%d-%H%M%S")
-    with open(f"results/benchmark_{timestamp}.json", 'w') as f:
+    if append_to:
+        results_path = append_to
+    else:
+        os.makedirs("results", exist_ok=True)
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        results_path = f"results/benchmark_{timestamp}.json"
+    with open(results_path, 'w') as f:
         json.dump(results, f, indent=2)
         
     return results
 
 def visualize_results(results: Dict[str, Any]):
     """Visualize benchmark results."""
+    # Imported here so processes that never plot don't pay for matplotlib
+    import matplotlib
+    matplotlib.use("Agg")  # Render to files only; don't probe for a GUI backend
+    import matplotlib.pyplot as plt
+    
+    import pandas as pd
+    
     # Extract the data we need for plotting
     models = ['single', 'threaded', 'multiprocess']
     model_labels = {
@@ -75,133 +169,93 @@ def visualize_results(results: Dict[str, Any]):
         'threaded': 'Multi-threading',
         'multiprocess': 'Multi-processing'
     }
+    model_colors = {
+        'single': 'blue',
+        'threaded': 'red',
+        'multiprocess': 'green'
+    }
     
-    # Group by task count and worker count
-    datasets = {}
-    for model in models:
-        for result in results[model]:
-            task_count = result['num_tasks']
-            worker_count = result['num_workers']
-            key = f"{task_count}_{worker_count}"
-            
-            if key not in datasets:
-                datasets[key] = {
-                    'task_count': task_count,
-                    'worker_count': worker_count,
-                    'models': []
-                }
-            
-            datasets[key]['models'].append({
-                'name': model_labels[model],
-                'total_time': result['total_time'],
-                'tasks_per_second': result['tasks_per_second'],
-                'memory_mb': result['memory_mb']
-            })
+    # Index results by (model, task count, worker count) for direct lookups
+    index = {
+        (model, result['num_tasks'], result['num_workers']): result
+        for model in models
+        for result in results[model]
+    }
+    
+    # One row per benchmark run, tagged with its model
+    df = pd.DataFrame([
+        {
+            'model': model,
+            'num_tasks': result['num_tasks'],
+            'num_workers': result['num_workers'],
+            'tasks_per_second': result['tasks_per_second'],
+            'memory_mb': result['memory_mb']
+        }
+        for model in models
+        for result in results[model]
+    ])
+    if df.empty:
+        return
     
     # Create plots
     os.makedirs("plots", exist_ok=True)
     timestamp = time.strftime("%Y%m%d-%H%M%S")
     
-    # 1. Performance comparison for all models
-    plt.figure(figsize=(12, 8))
-    
     # Get unique task counts and worker counts
-    task_counts = sorted(set(data['task_count'] for data in datasets.values()))
-    worker_counts = sorted(set(data['worker_count'] for data in datasets.values()))
+    task_counts = sorted(df['num_tasks'].unique().tolist())
+    worker_counts = sorted(df['num_workers'].unique().tolist())
+    
+    # 1. Performance comparison: tasks per second by worker count for each task count
+    tps = df.pivot_table(index='num_tasks', columns=['model', 'num_workers'], values='tasks_per_second')
     
-    # Plot tasks per second for each model and task count
     for task_count in task_counts:
-        x_labels = []
-        threaded_tps = []
-        multiprocess_tps = []
-        single_tps = []
-        
-        for worker_count in worker_counts:
-            key = f"{task_count}_{worker_count}"
-            if key in datasets:
-                data = datasets[key]
-                x_labels.append(f"{worker_count}")
-                
-                for model in data['models']:
-                    if model['name'] == 'Single Process':
-                        single_tps.append(model['tasks_per_second'])
-                    elif model['name'] == 'Multi-threading':
-                        threaded_tps.append(model['tasks_per_second'])
-                    elif model['name'] == 'Multi-processing':
-                        multiprocess_tps.append(model['tasks_per_second'])
+        row = tps.loc[task_count]
         
-        # Skip if no data for this task count
-        if not x_labels:
-            continue
-            
         plt.figure(figsize=(10, 6))
         
-        # Plot the data
-        if single_tps:
-            plt.plot([x_labels[0]], single_tps, 'bo-', label='Single Process')
-        if threaded_tps:
-            plt.plot(x_labels, threaded_tps, 'ro-', label='Multi-threading')
-        if multiprocess_tps:
-            plt.plot(x_labels, multiprocess_tps, 'go-', label='Multi-processing')
+        for model in models:
+            if model not in row.index.get_level_values('model'):
+                continue
+            series = row[model].dropna()
+            if not series.empty:
+                plt.plot(series.index, series.values, 'o-', color=model_colors[model], label=model_labels[model])
         
         plt.title(f'Performance Comparison ({task_count} tasks)')
         plt.xlabel('Number of Workers')
         plt.ylabel('Tasks Per Second')
+        plt.xticks(sorted(row.dropna().index.get_level_values('num_workers').unique()))
         plt.legend()
         plt.grid(True)
         plt.savefig(f"plots/performance_{task_count}_tasks_{timestamp}.png")
         plt.close()
     
-    # 2. Memory usage comparison
+    # 2. Memory usage comparison: peak memory per model for each task count
     plt.figure(figsize=(10, 6))
     
-    # Collect memory data for different models
-    task_counts_str = [str(tc) for tc in task_counts]
-    mem_single = []
-    mem_threaded = []
-    mem_multiprocess = []
-    
-    for task_count in task_counts:
-        # Use the first worker count entry for each task count
-        for worker_count in worker_counts:
-            key = f"{task_count}_{worker_count}"
-            if key in datasets:
-                data = datasets[key]
-                for model in data['models']:
-                    if model['name'] == 'Single Process':
-                        mem_single.append(model['memory_mb'])
-                        break
-                        
-        # Use the highest worker count for multi-threading and multi-processing
-        max_worker = max(worker_counts)
-        key = f"{task_count}_{max_worker}"
-        if key in datasets:
-            data = datasets[key]
-            for model in data['models']:
-                if model['name'] == 'Multi-threading':
-                    mem_threaded.append(model['memory_mb'])
-                elif model['name'] == 'Multi-processing':
-                    mem_multiprocess.append(model['memory_mb'])
+    memory = (df.groupby(['num_tasks', 'model'])['memory_mb'].max()
+              .unstack('model')
+              .reindex(index=task_counts, columns=models))
     
     # Plot memory usage
-    x = list(range(len(task_counts_str)))
+    x = list(range(len(task_counts)))
     width = 0.25
     
-    plt.bar([i - width for i in x], mem_single, width, label='Single Process', color='blue')
-    plt.bar(x, mem_threaded, width, label='Multi-threading', color='red')
-    plt.bar([i + width for i in x], mem_multiprocess, width, label='Multi-processing', color='green')
+    for offset, model in zip((-width, 0, width), models):
+        plt.bar([i + offset for i in x], memory[model].tolist(), width,
+                label=model_labels[model], color=model_colors[model])
     
     plt.xlabel('Number of Tasks')
     plt.ylabel('Memory Usage (MB)')
     plt.title('Memory Usage Comparison')
-    plt.xticks(x, task_counts_str)
+    plt.xticks(x, [str(tc) for tc in task_counts])
     plt.legend()
     plt.grid(True, axis='y')
     plt.tight_layout()
     plt.savefig(f"plots/memory_comparison_{timestamp}.png")
     plt.close()
 
-    # Create a summary report
+    # Create a summary report; results/ may not exist if every result was cached or appended elsewhere
+    os.makedirs("results", exist_ok=True)
     with open(f"results/summary_{timestamp}.txt", 'w') as f:
         f.write("Benchmark Summary\n")
         f.write("=================\n\n")
@@ -212,29 +266,15 @@ def visualize_results(results: Dict[str, Any]):
             f.write(f"{'Model':<20} {'Workers':<10} {'Time (s)':<12} {'Tasks/s':<12} {'Memory (MB)':<12}\n")
             f.write("-" * 70 + "\n")
             
-            # Single process data
-            for data in results['single']:
-                if data['num_tasks'] == task_count:
-                    f.write(f"{'Single Process':<20} {data['num_workers']:<10} {data['total_time']:<12.2f} {data['tasks_per_second']:<12.2f} {data['memory_mb']:<12.2f}\n")
-                    break
-            
-            # Threaded data
-            for worker_count in worker_counts:
-                for data in results['threaded']:
-                    if data['num_tasks'] == task_count and data['num_workers'] == worker_count:
-                        f.write(f"{'Multi-threading':<20} {data['num_workers']:<10} {data['total_time']:<12.2f} {data['tasks_per_second']:<12.2f} {data['memory_mb']:<12.2f}\n")
-                        break
-            
-            # Multiprocess data
-            for worker_count in worker_counts:
-                for data in results['multiprocess']:
-                    if data['num_tasks'] == task_count and data['num_workers'] == worker_count:
-                        f.write(f"{'Multi-processing':<20} {data['num_workers']:<10} {data['total_time']:<12.2f} {data['tasks_per_second']:<12.2f} {data['memory_mb']:<12.2f}\n")
-                        break
+            for model in models:
+                for worker_count in worker_counts:
+                    data = index.get((model, task_count, worker_count))
+                    if data is not None:
+                        f.write(f"{model_labels[model]:<20} {data['num_workers']:<10} {data['total_time']:<12.2f} {data['tasks_per_second']:<12.2f} {data['memory_mb']:<12.2f}\n")
             
             f.write("\n")
 
-def main():
+def main(force: bool = False, append_to: Optional[str] = None):
     """Main entry point for running benchmarks."""
     logger = Logger("main")
     logger.info("Starting HTTP server simulation benchmark")
@@ -245,13 +285,13 @@ def main():
     
     # Configure benchmark parameters
     task_counts = [10, 50, 100]
-    worker_counts = [1, max(1, cpu_count // 2), cpu_count, cpu_count * 2]
+    worker_counts = get_worker_counts(cpu_count)
     
     logger.info(f"Task counts: {task_counts}")
     logger.info(f"Worker counts: {worker_counts}")
     
     # Run the comprehensive benchmark
-    results = run_comprehensive_benchmark(task_counts, worker_counts)
+    results = run_comprehensive_benchmark(task_counts, worker_counts, force=force, append_to=append_to)
     
     # Visualize results
     logger.info("Creating visualizations...")
@@ -260,4 +300,6 @@ def main():
     logger.info("Benchmark completed")
 
 if __name__ == "__main__":
+    configure_start_method()
+    gc.freeze()  # Keep the long-lived import graph out of generational collections
     main()
\ No newline at end of file
@@ -6,13 +6,15 @@ import logging
 import os
 import time
 from typing import Optional
-import multiprocessing
-import threading
+
+# Process and thread ids come from the LogRecord, so they are only looked up
+# and formatted for records that are actually emitted
+LOG_FORMAT = '%(asctime)s [%(levelname)s] [PID=%(process)d|TID=%(thread)d] %(message)s'
 
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
+    format=LOG_FORMAT,
     handlers=[
         logging.StreamHandler(),
     ]
@@ -30,26 +32,27 @@ class Logger:
         if log_file:
             os.makedirs("logs", exist_ok=True)
             file_handler = logging.FileHandler(f"logs/{log_file}")
-            file_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
+            file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
             self.logger.addHandler(file_handler)
     
-    def info(self, message: str):
-        """Log an info message with process/thread information."""
-        pid = os.getpid()
-        thread_id = threading.get_ident()
-        self.logger.info(f"[PID={pid}|TID={thread_id}] {message}")
+    def info_enabled(self) -> bool:
+        """Return whether info records are emitted, so hot paths can skip building their arguments."""
+        return self.logger.isEnabledFor(logging.INFO)
+    
+    def info(self, message: str, *args):
+        """Log an info message with process/thread information.
+        
+        Extra arguments are %-formatted into the message only if the record is emitted.
+        """
+        self.logger.info(message, *args)
     
-    def error(self, message: str):
+    def error(self, message: str, *args):
         """Log an error message with process/thread information."""
-        pid = os.getpid()
-        thread_id = threading.get_ident()
-        self.logger.error(f"[PID={pid}|TID={thread_id}] {message}")
+        self.logger.error(message, *args)
     
-    def debug(self, message: str):
+    def debug(self, message: str, *args):
         """Log a debug message with process/thread information."""
-        pid = os.getpid()
-        thread_id = threading.get_ident()
-        self.logger.debug(f"[PID={pid}|TID={thread_id}] {message}")
+        self.logger.debug(message, *args)
 
 class PerformanceMonitor:
     """Tracks performance metrics for processes."""
@@ -58,8 +61,16 @@ class PerformanceMonitor:
         self.name = name
         self.start_time = None
         self.end_time = None
+        self.process = None
         self.logger = Logger(f"performance.{name}")
         
+    def start_cpu_sampling(self):
+        """Take the initial CPU sample so later readings don't have to block."""
+        import psutil
+        
+        self.process = psutil.Process(os.getpid())
+        self.process.cpu_percent(interval=None)
+        
     def start(self):
         """Start the performance tracking."""
         self.start_time = time.time()
@@ -73,14 +84,18 @@ class PerformanceMonitor:
         return duration
     
     def log_memory_usage(self, process=None):
-        """Log memory usage of the current or specified process."""
-        import psutil
+        """Log memory usage of the current or specified process.
         
+        CPU usage is measured since the previous sample without blocking, so a
+        process that hasn't been sampled before reports 0%.
+        """
         if process is None:
-            process = psutil.Process(os.getpid())
+            if self.process is None:
+                self.start_cpu_sampling()
+            process = self.process
         
         mem_info = process.memory_info()
-        cpu_percent = process.cpu_percent(interval=0.1)
+        cpu_percent = process.cpu_percent(interval=None)
         
         self.logger.info(f"Memory usage: {mem_info.rss / 1024 / 1024:.2f} MB | "
                          f"CPU: {cpu_percent:.1f}%")
@@ -4,8 +4,9 @@ Main entry point for the HTTP server simulation.
 
 import argparse
 import os
+import gc
 from benchmark import main as benchmark_main
-from master import SingleProcessMaster, ThreadedMaster, MultiprocessMaster
+from master import SingleProcessMaster, ThreadedMaster, MultiprocessMaster, configure_start_method
 from logger import Logger
 
 def run_single_model(model_type, num_workers, num_tasks):
@@ -45,15 +46,21 @@ def main():
                         help="Number of workers (for threaded and multiprocess models)")
     parser.add_argument("--tasks", type=int, default=50,
                         help="Number of tasks to generate")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-run benchmark configurations even if cached results exist")
+    parser.add_argument("--append", type=str, metavar="RESULTS_FILE",
+                        help="Only run configurations missing from RESULTS_FILE and merge the new results into it")
     
     args = parser.parse_args()
     
     if args.benchmark:
-        benchmark_main()
+        benchmark_main(force=args.force, append_to=args.append)
     elif args.model:
         run_single_model(args.model, args.workers, args.tasks)
     else:
         parser.print_help()
 
 if __name__ == "__main__":
+    configure_start_method()
+    gc.freeze()  # Keep the long-lived import graph out of generational collections
     main()
\ No newline at end of file
@@ -4,17 +4,19 @@ Master process implementation for the HTTP server simulation.
 
 import time
 import os
+import gc
 import signal
 import multiprocessing
 from multiprocessing import Queue as ProcessQueue
 import queue
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from typing import List, Dict, Any, Optional, Union
-import psutil
 
-from worker import ThreadWorker, ProcessWorker
-from task import Task, generate_random_task
+from worker import make_worker, gil_enabled, run_task, run_task_batch
+from task import Task, TaskPool, generate_random_tasks
 from logger import Logger, PerformanceMonitor
+from shared_queue import SharedRingQueue
 
 class Master:
     """Base master class for managing workers and tasks."""
@@ -27,11 +29,20 @@ class Master:
         self.result_queue = None
         self.logger = Logger(f"master.{name}")
         self.performance = PerformanceMonitor(f"master.{name}")
+        self.performance.start_cpu_sampling()
         self.running = False
         self.tasks_submitted = 0
         self.tasks_completed = 0
+        self.early_results = []  # Results collected while tasks were still being submitted
+        self.rng = self.create_rng()
+        self.task_pool = TaskPool()
         self.create_queues()
         
+    def create_rng(self):
+        """Create the random generator used for workload generation outside the timed region."""
+        import numpy as np
+        return np.random.default_rng()
+        
     def create_queues(self):
         """Create task and result queues - to be implemented by subclasses."""
         raise NotImplementedError("Subclasses must implement create_queues")
@@ -47,21 +58,28 @@ class Master:
             worker.start()
         self.running = True
         
-    def stop_workers(self):
-        """Stop all worker processes/threads."""
+    def stop_workers(self, timeout: float = 2.0):
+        """Stop all worker processes/threads, terminating any that don't stop within the timeout."""
         if not self.running:
             return
             
         self.logger.info(f"Stopping {len(self.workers)} workers...")
         
-        # Send poison pills to stop workers
-        for _ in range(len(self.workers)):
-            self.task_queue.put(None)
+        # Send each worker a poison pill. A full bounded queue that stays full means
+        # the workers have stopped consuming, so the remaining pills won't fit either
+        for worker in self.workers:
+            try:
+                worker.stop(timeout)
+            except queue.Full:
+                self.logger.error("Task queue is full, workers that don't stop will be terminated")
+                break
             
         # Join all workers
         for worker in self.workers:
-            if hasattr(worker, 'join'):
-                worker.join(timeout=2.0)
+            worker.join(timeout)
+            if worker.is_alive():
+                self.logger.error(f"Worker {worker.worker_id} did not stop, terminating it")
+                worker.terminate()
                 
         self.running = False
         self.logger.info("All workers stopped")
@@ -70,7 +88,23 @@ class Master:
         """Submit a task to be processed."""
         self.task_queue.put(task)
         self.tasks_submitted += 1
-        self.logger.info(f"Task {task.id} submitted ({task.task_type})")
+        self.logger.debug("Task %s submitted (%s)", task.id, task.task_type)
+        
+    def flush_tasks(self):
+        """Send any buffered tasks to the workers - no-op unless a subclass batches submissions."""
+        pass
+        
+    @staticmethod
+    def _as_batch(received) -> List[Task]:
+        """Normalize a result queue item - workers may send a single task or a list of tasks."""
+        return received if isinstance(received, list) else [received]
+        
+    def _get_results(self, block: bool = True, timeout: Optional[float] = None) -> List[Task]:
+        """Take the next result batch, or every ready batch if the queue can hand over several at once."""
+        get_many = getattr(self.result_queue, 'get_many', None)
+        if get_many is None:
+            return self._as_batch(self.result_queue.get(block=block, timeout=timeout))
+        return [task for received in get_many(block, timeout) for task in self._as_batch(received)]
         
     def collect_results(self, timeout: Optional[float] = 0.5) -> List[Task]:
         """Collect completed tasks from the result queue."""
@@ -78,9 +112,9 @@ class Master:
         
         try:
             while True:
-                result = self.result_queue.get(block=False)
-                results.append(result)
-                self.tasks_completed += 1
+                batch = self._get_results(block=False)
+                results.extend(batch)
+                self.tasks_completed += len(batch)
                 if hasattr(self.result_queue, 'task_done'):
                     self.result_queue.task_done()
         except Exception:  # Handle any queue empty exceptions
@@ -93,41 +127,50 @@ class Master:
         self.logger.info(f"Generating workload of {num_tasks} tasks...")
         self.performance.start()
         
-        for i in range(num_tasks):
-            task = generate_random_task(i+1)
+        for task in generate_random_tasks(num_tasks, rng=self.rng, pool=self.task_pool):
             self.submit_task(task)
+        self.flush_tasks()
             
         return self.tasks_submitted
         
-    def wait_for_completion(self, check_interval: float = 0.5, timeout: Optional[float] = None) -> List[Task]:
+    def process_workload(self, num_tasks: int) -> List[Task]:
+        """Generate the workload and wait for the workers to complete it."""
+        self.generate_workload(num_tasks)
+        return self.wait_for_completion()
+        
+    def wait_for_completion(self, check_interval: float = 1.0, timeout: Optional[float] = None) -> List[Task]:
         """Wait for all submitted tasks to be completed."""
-        all_results = []
+        all_results, self.early_results = self.early_results, []
         start_time = time.time()
         last_status_time = start_time
         
         self.logger.info(f"Waiting for {self.tasks_submitted} tasks to complete...")
         
         while self.tasks_completed < self.tasks_submitted:
-            # Check for timeout
-            if timeout and (time.time() - start_time) > timeout:
-                self.logger.error(f"Timeout reached after {timeout} seconds")
-                break
+            # Block on the result queue so a result is handled as soon as it arrives
+            wait = check_interval
+            if timeout:
+                remaining = timeout - (time.time() - start_time)
+                if remaining <= 0:
+                    self.logger.error(f"Timeout reached after {timeout} seconds")
+                    break
+                wait = min(wait, remaining)
+                
+            try:
+                batch = self._get_results(timeout=wait)
+                all_results.extend(batch)
+                self.tasks_completed += len(batch)
+                if hasattr(self.result_queue, 'task_done'):
+                    self.result_queue.task_done()
+            except queue.Empty:
+                pass
                 
-            # Collect any completed tasks
-            results = self.collect_results()
-            all_results.extend(results)
-            
             # Print status every 5 seconds
             current_time = time.time()
             if current_time - last_status_time >= 5.0:
                 self.logger.info(f"Progress: {self.tasks_completed}/{self.tasks_submitted} tasks completed")
                 last_status_time = current_time
                 
-                # Log resource usage
-                self.performance.log_memory_usage()
-                
-            time.sleep(check_interval)
-            
         # Final collection of results
         results = self.collect_results()
         all_results.extend(results)
@@ -137,15 +180,39 @@ class Master:
         
         return all_results
         
+    def reset_counters(self):
+        """Reset the task counters so the same workers can run another workload."""
+        self.tasks_submitted = 0
+        self.tasks_completed = 0
+        self.early_results = []
+        
     def run_benchmark(self, num_tasks: int = 50) -> Dict[str, Any]:
-        """Run a benchmark with a fixed number of tasks."""
+        """Run a benchmark with a fixed number of tasks.
+        
+        Workers that are already running are reused and left running, so a caller
+        can start them once and run several benchmarks; otherwise they are started
+        and stopped here.
+        """
+        owns_workers = not self.running
+        self.reset_counters()
         try:
-            self.start_workers()
+            if owns_workers:
+                self.start_workers()
             
-            start_time = time.time()
-            self.generate_workload(num_tasks)
-            results = self.wait_for_completion()
-            end_time = time.time()
+            # Resource usage is logged only outside the measured region
+            self.performance.log_memory_usage()
+            
+            # Collect up front and keep the cyclic GC from pausing the measured region
+            gc.collect()
+            gc_was_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                start_time = time.time()
+                results = self.process_workload(num_tasks)
+                end_time = time.time()
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
             
             # Calculate statistics
             total_time = end_time - start_time
@@ -167,8 +234,7 @@ class Master:
                 avg_by_type[task_type] = sum(times) / len(times)
                 
             # Get memory usage
-            process = psutil.Process(os.getpid())
-            memory_mb = process.memory_info().rss / 1024 / 1024
+            memory_mb = self.performance.log_memory_usage()['memory_mb']
             
             benchmark_result = {
                 'master_type': self.name,
@@ -187,61 +253,216 @@ class Master:
             self.logger.info(f"- Average task time: {avg_task_time:.3f}s")
             self.logger.info(f"- Memory usage: {memory_mb:.2f} MB")
             
+            # The statistics are computed, so the tasks can be reused by the next run
+            for task in results:
+                self.task_pool.release(task)
+                
             return benchmark_result
             
         finally:
-            self.stop_workers()
+            if owns_workers:
+                self.stop_workers()
 
 class SingleProcessMaster(Master):
-    """Master implementation using a single process for all tasks."""
+    """Master implementation that executes every task inline in a single thread."""
     
     def __init__(self, num_workers: int = 1):
         super().__init__("single_process", num_workers=1)  # Always use 1 worker
-        self.create_workers()
         
     def create_queues(self):
-        """Create regular Python queues."""
-        self.task_queue = queue.Queue()
-        self.result_queue = queue.Queue()
+        """No queues are needed - tasks are executed directly."""
+        pass
         
     def create_workers(self):
-        """Create a single worker that processes tasks sequentially."""
-        self.workers = [ThreadWorker(1, self.task_queue, self.result_queue)]
+        """No workers are needed - tasks are executed directly."""
+        pass
+        
+    def start_workers(self):
+        """Nothing to start - tasks are executed directly."""
+        self.running = True
+        
+    def stop_workers(self):
+        """Nothing to stop - tasks are executed directly."""
+        self.running = False
+        
+    def process_workload(self, num_tasks: int) -> List[Task]:
+        """Generate and execute each task in turn without any queue or worker thread."""
+        self.logger.info(f"Processing workload of {num_tasks} tasks inline...")
+        self.performance.start()
+        
+        tasks = generate_random_tasks(num_tasks, rng=self.rng, pool=self.task_pool)
+        self.tasks_submitted += len(tasks)
+        results = run_task_batch(tasks, self.logger)
+        self.tasks_completed += len(results)
+            
+        duration = self.performance.stop()
+        self.logger.info(f"Completed {self.tasks_completed}/{self.tasks_submitted} tasks in {duration:.2f}s")
+        
+        return results
 
 class ThreadedMaster(Master):
-    """Master implementation using multiple threads for concurrent processing."""
+    """Master implementation using a thread pool for concurrent processing."""
     
     def __init__(self, num_workers: int = 4):
         super().__init__("threaded", num_workers)
-        self.create_workers()
+        self.executor = None
+        self.futures = []
         
     def create_queues(self):
-        """Create thread-safe queues."""
-        self.task_queue = queue.Queue()
-        self.result_queue = queue.Queue()
+        """No queues are needed - the thread pool manages its own work queue."""
+        pass
         
     def create_workers(self):
-        """Create multiple thread workers."""
-        self.workers = [
-            ThreadWorker(i+1, self.task_queue, self.result_queue)
-            for i in range(self.num_workers)
-        ]
+        """No workers are needed - threads are owned by the pool."""
+        pass
+        
+    def start_workers(self):
+        """Start the thread pool."""
+        self.logger.info(f"Starting thread pool with {self.num_workers} workers...")
+        # The executor owns the work queue, the threads and shutdown, so there are
+        # no hand-rolled queues or poison pills
+        self.executor = ThreadPoolExecutor(max_workers=self.num_workers,
+                                           thread_name_prefix="thread.worker")
+        self.running = True
+        
+    def stop_workers(self):
+        """Shut down the thread pool once queued tasks have finished."""
+        if not self.running:
+            return
+            
+        self.executor.shutdown(wait=True)
+        self.running = False
+        self.logger.info("Thread pool stopped")
+        
+    def submit_task(self, task: Task):
+        """Submit a task to the thread pool; it runs through run_task."""
+        self.futures.append(self.executor.submit(run_task, task, self.logger))
+        self.tasks_submitted += 1
+        self.logger.debug("Task %s submitted (%s)", task.id, task.task_type)
+        
+    def wait_for_completion(self, check_interval: float = 1.0, timeout: Optional[float] = None) -> List[Task]:
+        """Gather tasks from the pool as they complete."""
+        all_results = []
+        
+        self.logger.info(f"Waiting for {self.tasks_submitted} tasks to complete...")
+        
+        try:
+            for future in as_completed(self.futures, timeout=timeout):
+                all_results.append(future.result())
+                self.tasks_completed += 1
+        except FuturesTimeoutError:
+            self.logger.error(f"Timeout reached after {timeout} seconds")
+        self.futures = []
+        
+        duration = self.performance.stop()
+        self.logger.info(f"Completed {self.tasks_completed}/{self.tasks_submitted} tasks in {duration:.2f}s")
+        
+        return all_results
 
 class MultiprocessMaster(Master):
-    """Master implementation using multiple processes for parallel processing."""
+    """Master implementation using multiple processes for parallel processing.
+    
+    On a free-threaded interpreter with the GIL disabled, threads already run
+    CPU-bound tasks in parallel, so thread workers are used instead and tasks
+    skip pickling and IPC entirely.
+    """
+    
+    max_batch_size = 8
+    max_workers = 32
     
     def __init__(self, num_workers: int = 4):
-        super().__init__("multiprocess", num_workers)
+        self.use_threads = not gil_enabled()
+        # Each process carries its own interpreter, so bound the pool size
+        super().__init__("multiprocess", min(num_workers, self.max_workers))
+        self.batch_size = self.max_batch_size
+        self.pending_tasks = []
         self.create_workers()
         
     def create_queues(self):
-        """Create process-safe queues."""
-        self.task_queue = multiprocessing.Queue()
-        self.result_queue = multiprocessing.Queue()
+        """Create shared-memory queues.
+        
+        Task batches and result batches are copied through two shared-memory rings
+        in a single segment, so there is no feeder thread or pipe write per item.
+        """
+        if self.use_threads:
+            self.task_queue = queue.Queue()
+            self.result_queue = queue.Queue()
+            return
+            
+        self.task_queue, self.result_queue = SharedRingQueue.pair()
         
     def create_workers(self):
-        """Create multiple process workers."""
+        """Create multiple process workers (thread workers when the GIL is disabled)."""
         self.workers = [
-            ProcessWorker(i+1, self.task_queue, self.result_queue)
+            make_worker(i+1, self.task_queue, self.result_queue, self.num_workers)
             for i in range(self.num_workers)
-        ]
\ No newline at end of file
+        ]
+        
+    def start_workers(self):
+        """Start the workers, limiting numeric libraries in process workers to one thread each.
+        
+        The shared-memory queues are released when the workers stop, so a restart
+        creates fresh queues and workers first.
+        """
+        if self.task_queue is None:
+            self.create_queues()
+            self.create_workers()
+        if not self.use_threads:
+            # OpenMP/BLAS read these when they load, so they must be in the environment the
+            # workers (and the forkserver they fork from) inherit, not set inside the workers
+            os.environ.setdefault('OMP_NUM_THREADS', '1')
+            os.environ.setdefault('OPENBLAS_NUM_THREADS', '1')
+        super().start_workers()
+        
+    def stop_workers(self, timeout: float = 2.0):
+        """Stop the process workers and release the shared-memory queues."""
+        if not self.running:
+            return
+            
+        super().stop_workers(timeout)
+        if not self.use_threads:
+            self.task_queue.close()
+            self.result_queue.close()
+            self.task_queue = self.result_queue = None
+        
+    def submit_task(self, task: Task):
+        """Buffer a task and send it once a full batch is ready."""
+        if self.use_threads:
+            # Thread workers take single tasks and drain their own batches
+            super().submit_task(task)
+            return
+            
+        self.pending_tasks.append(task)
+        self.tasks_submitted += 1
+        self.logger.debug("Task %s submitted (%s)", task.id, task.task_type)
+        
+        if len(self.pending_tasks) >= self.batch_size:
+            self.flush_tasks()
+            
+    def flush_tasks(self, retry_interval: float = 0.05):
+        """Send the buffered tasks to the workers as a single batch.
+        
+        Both rings are bounded, so while the task ring is full the master drains the
+        result ring; otherwise workers blocked on a full result ring could never free
+        a task slot. Results taken here are returned by wait_for_completion.
+        """
+        if not self.pending_tasks:
+            return
+            
+        while True:
+            try:
+                self.task_queue.put(self.pending_tasks, timeout=retry_interval)
+                break
+            except queue.Full:
+                self.early_results.extend(self.collect_results())
+        self.pending_tasks = []
+            
+    def generate_workload(self, num_tasks: int):
+        """Generate tasks, keeping at least one batch per worker for small workloads."""
+        self.batch_size = max(1, min(self.max_batch_size, num_tasks // self.num_workers))
+        return super().generate_workload(num_tasks)
+
+def configure_start_method():
+    """Start process workers from a forkserver where the platform supports it."""
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        multiprocessing.set_start_method('forkserver', force=True)
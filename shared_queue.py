@@ -0,0 +1,123 @@
+"""
+Shared-memory queue for passing tasks between processes in the HTTP server simulation.
+"""
+
+import multiprocessing
+import pickle
+import queue
+import struct
+from multiprocessing import shared_memory
+
+# Each slot starts with the length of the pickled item stored in it
+_SLOT_HEADER = struct.Struct('I')
+
+class SharedRingQueue:
+    """A multi-producer, multi-consumer queue backed by a ring of fixed-size slots in shared memory.
+    
+    Items are pickled straight into a slot, so unlike multiprocessing.Queue there is no
+    feeder thread and no pipe write per item: a put or get is a semaphore operation, a
+    short critical section to claim the next slot and a copy into or out of shared memory.
+    """
+    
+    def __init__(self, capacity: int = 256, slot_size: int = 16384, shm=None, offset: int = 0,
+                 owner: bool = False):
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self._offset = offset  # Start of this ring's slots within the segment
+        if shm is None:
+            shm = shared_memory.SharedMemory(create=True, size=capacity * slot_size)
+            owner = True
+        self._shm = shm
+        self._head = multiprocessing.RawValue('Q', 0)  # Next slot to read
+        self._tail = multiprocessing.RawValue('Q', 0)  # Next slot to write
+        self._put_lock = multiprocessing.Lock()
+        self._get_lock = multiprocessing.Lock()
+        self._items = multiprocessing.Semaphore(0)
+        self._free_slots = multiprocessing.Semaphore(capacity)
+        self._owner = owner  # Only the ring that created the segment unlinks it
+    
+    @classmethod
+    def pair(cls, capacity: int = 256, slot_size: int = 16384):
+        """Create a task ring and a result ring that share one shared-memory segment.
+        
+        A worker pickled with both rings maps the segment once instead of twice.
+        """
+        size = capacity * slot_size
+        shm = shared_memory.SharedMemory(create=True, size=2 * size)
+        return cls(capacity, slot_size, shm, owner=True), cls(capacity, slot_size, shm, offset=size)
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._owner = False  # Only the creating process unlinks the shared memory
+    
+    def put(self, item, block: bool = True, timeout: float = None):
+        """Put an item into the queue, waiting for a free slot if necessary."""
+        data = pickle.dumps(item, pickle.HIGHEST_PROTOCOL)
+        if _SLOT_HEADER.size + len(data) > self.slot_size:
+            raise ValueError(f"Item of {len(data)} bytes does not fit in a {self.slot_size}-byte slot")
+        
+        if not self._free_slots.acquire(block, timeout):
+            raise queue.Full
+        
+        # Write under the lock so consumers never see a slot before it is complete
+        with self._put_lock:
+            offset = self._offset + (self._tail.value % self.capacity) * self.slot_size
+            _SLOT_HEADER.pack_into(self._shm.buf, offset, len(data))
+            start = offset + _SLOT_HEADER.size
+            self._shm.buf[start:start + len(data)] = data
+            self._tail.value += 1
+        self._items.release()
+    
+    def get(self, block: bool = True, timeout: float = None):
+        """Remove and return an item, raising queue.Empty if none arrives in time."""
+        if not self._items.acquire(block, timeout):
+            raise queue.Empty
+        
+        with self._get_lock:
+            offset = self._offset + (self._head.value % self.capacity) * self.slot_size
+            (length,) = _SLOT_HEADER.unpack_from(self._shm.buf, offset)
+            start = offset + _SLOT_HEADER.size
+            data = bytes(self._shm.buf[start:start + length])
+            self._head.value += 1
+        self._free_slots.release()
+        
+        return pickle.loads(data)
+    
+    def get_many(self, block: bool = True, timeout: float = None, max_messages_to_get: int = 64) -> list:
+        """Remove and return every ready item, up to ``max_messages_to_get``, waiting only for the first.
+        
+        All the items are read in one critical section, so draining several costs a
+        single lock round trip.
+        """
+        if not self._items.acquire(block, timeout):
+            raise queue.Empty
+        count = 1
+        while count < max_messages_to_get and self._items.acquire(False):
+            count += 1
+        
+        with self._get_lock:
+            chunks = []
+            for _ in range(count):
+                offset = self._offset + (self._head.value % self.capacity) * self.slot_size
+                (length,) = _SLOT_HEADER.unpack_from(self._shm.buf, offset)
+                start = offset + _SLOT_HEADER.size
+                chunks.append(bytes(self._shm.buf[start:start + length]))
+                self._head.value += 1
+        for _ in range(count):
+            self._free_slots.release()
+        
+        return [pickle.loads(data) for data in chunks]
+    
+    def get_nowait(self):
+        """Remove and return an item if one is immediately available."""
+        return self.get(block=False)
+    
+    def empty(self) -> bool:
+        """Return True if the queue is empty (a snapshot that may change immediately)."""
+        return self._head.value == self._tail.value
+    
+    def close(self):
+        """Release this process's mapping, unlinking the segment if this process created it."""
+        self._shm.close()  # Safe to repeat for rings that share a segment
+        if self._owner:
+            self._shm.unlink()
@@ -5,105 +5,230 @@ Task definition and utilities for the HTTP server simulation.
 import time
 import random
 import os
-from dataclasses import dataclass
-from typing import Callable, Any, Optional, Dict
+import queue
+from dataclasses import dataclass, field
+from typing import Callable, Any, Optional, Dict, List
 
-@dataclass
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; the kernel falls back to pure Python
+    njit = None
+
+TEMP_DIR = "temp_files"
+os.makedirs(TEMP_DIR, exist_ok=True)
+
+@dataclass(slots=True)
 class Task:
-    """Represents a task to be processed by a worker."""
+    """Represents a task to be processed by a worker.
+    
+    Task parameters are typed fields rather than a payload dict. Fields a task
+    type doesn't use keep their zero value, and the task function falls back
+    to its own default for them.
+    """
     id: int
     task_type: str  # 'io', 'cpu', or 'mixed'
-    payload: Dict[str, Any]
-    result: Any = None
+    iterations: int = 0
+    complexity: int = 0
+    size: int = 0
+    filename: str = ''
+    content: str = ''
+    result: Any = None  # Task output, or the exception the task raised
     processing_time: float = 0.0
+    func: Callable = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Resolve the task function once so workers can call it directly; this
+        # is get_task_function inlined, as it runs for every task created
+        self.func = _TASK_FUNCS.get(self.task_type, _DEFAULT_TASK_FUNC)
     
     def __str__(self):
         return f"Task({self.id}, {self.task_type}, processed in {self.processing_time:.3f}s)"
 
-def io_task(payload: Dict[str, Any]) -> Any:
-    """Simulates an I/O bound task like file operations."""
-    filename = payload.get('filename', f"temp_{random.randint(1000, 9999)}.txt")
-    content = payload.get('content', f"Content generated at {time.time()}")
-    size = payload.get('size', 1024)  # Default 1KB
+class TaskPool:
+    """A free list of Task objects so a producer can reuse tasks once their results are consumed."""
     
-    # Simulate file writing
-    filepath = os.path.join("temp_files", filename)
-    os.makedirs("temp_files", exist_ok=True)
-    
-    with open(filepath, 'w') as f:
-        # Write in small chunks to simulate longer I/O operation
-        chunk_size = 128
-        for i in range(0, size, chunk_size):
-            f.write(content[:chunk_size] + '\n')
-            time.sleep(0.001)  # Simulate disk I/O delay
-    
-    # Simulate file reading
-    with open(filepath, 'r') as f:
-        data = f.read()
+    def __init__(self):
+        self._free = queue.SimpleQueue()
+        
+    def acquire(self, **fields) -> Task:
+        """Get a task initialised with the given fields, reusing a released one if available."""
+        try:
+            task = self._free.get_nowait()
+        except queue.Empty:
+            return Task(**fields)
+        # Reinitialise in place, which also re-resolves the task function
+        task.__init__(**fields)
+        return task
         
-    return {'filepath': filepath, 'size': len(data)}
+    def release(self, task: Task):
+        """Return a task whose result is no longer needed to the pool."""
+        task.result = None  # Don't keep the old result alive while the task is idle
+        self._free.put(task)
 
-def cpu_task(payload: Dict[str, Any]) -> Any:
-    """Simulates a CPU bound task like data processing."""
-    iterations = payload.get('iterations', 1000000)
-    complexity = payload.get('complexity', 1)
+def _io_work(filename: str, content: str, size: int) -> Dict[str, Any]:
+    """Write a file of roughly ``size`` bytes and report its size on disk."""
+    # Simulate file writing
+    filepath = os.path.join(TEMP_DIR, filename)
     
+    # Build the whole body up front as bytes and write it with a single call,
+    # skipping the text-mode codec layer
+    chunk_size = 128
+    num_chunks = len(range(0, size, chunk_size))
+    body = ((content[:chunk_size] + '\n') * num_chunks).encode()
+    
+    with open(filepath, 'wb') as f:
+        f.write(body)
+    
+    # Simulate disk I/O delay once instead of sleeping per chunk
+    time.sleep(num_chunks * 0.001)
+    
+    # Check the written size with a stat instead of reading the file back
+    return {'filepath': filepath, 'size': os.path.getsize(filepath)}
+
+def _cpu_kernel(iterations: int, complexity: int) -> int:
+    """Sum ``i ** complexity % (i + 1)`` over ``range(iterations)``."""
     result = 0
-    for i in range(iterations):
-        # Simulating complex computation
-        result += i ** complexity % (i + 1 if i > 0 else 1)
-        
+    # The i == 0 term is always 0 % 1 == 0, so start the loop at 1
+    for i in range(1, iterations):
+        result += i ** complexity % (i + 1)
+    return result
+
+def _cpu_work(iterations: int, complexity: int, kernel: Callable = _cpu_kernel) -> Dict[str, Any]:
+    """Run the CPU kernel for the given number of iterations."""
+    if complexity == 1:
+        # i % (i + 1) == i, so the sum is the triangular number of iterations - 1
+        n = max(iterations, 0)
+        result = n * (n - 1) // 2
+    else:
+        result = kernel(iterations, complexity)
+    
     return {'iterations_completed': iterations, 'result': result}
 
-def mixed_task(payload: Dict[str, Any]) -> Any:
+def io_task(task: Task) -> Any:
+    """Simulates an I/O bound task like file operations."""
+    return _io_work(
+        task.filename or f"temp_{random.randint(1000, 9999)}.txt",
+        task.content or f"Content generated at {time.time()}",
+        task.size or 1024  # Default 1KB
+    )
+
+def cpu_task(task: Task, kernel: Callable = _cpu_kernel) -> Any:
+    """Simulates a CPU bound task like data processing."""
+    return _cpu_work(task.iterations or 1000000, task.complexity or 1, kernel)
+
+def mixed_task(task: Task, kernel: Callable = _cpu_kernel) -> Any:
     """Performs both I/O and CPU operations."""
     # First do some CPU work
-    cpu_result = cpu_task({
-        'iterations': payload.get('iterations', 500000),
-        'complexity': payload.get('complexity', 1)
-    })
+    cpu_result = _cpu_work(task.iterations or 500000, task.complexity or 1, kernel)
     
     # Then some I/O work
-    io_result = io_task({
-        'filename': payload.get('filename', f"mixed_{random.randint(1000, 9999)}.txt"),
-        'content': f"Result: {cpu_result['result']}",
-        'size': payload.get('size', 512)
-    })
+    io_result = _io_work(
+        task.filename or f"mixed_{random.randint(1000, 9999)}.txt",
+        f"Result: {cpu_result['result']}",
+        task.size or 512
+    )
     
     return {'cpu_result': cpu_result, 'io_result': io_result}
 
+# Pure-Python task implementations, available everywhere
+_PY_IMPLS = {
+    'io': io_task,
+    'cpu': cpu_task,
+    'mixed': mixed_task
+}
+
+# Task implementations whose CPU work runs in compiled code; preferred when present
+_NATIVE_IMPLS = {}
+
+if njit is not None:
+    # Compile to machine code with the GIL released so threaded workers scale
+    _native_cpu_kernel = njit(cache=True, nogil=True)(_cpu_kernel)
+    _native_cpu_kernel(1, 1)  # Warm up so JIT cost doesn't land in the first benchmark
+    
+    def native_cpu_task(task: Task) -> Any:
+        """cpu_task with the kernel compiled by Numba."""
+        return cpu_task(task, _native_cpu_kernel)
+    
+    def native_mixed_task(task: Task) -> Any:
+        """mixed_task with the CPU part compiled by Numba."""
+        return mixed_task(task, _native_cpu_kernel)
+    
+    _NATIVE_IMPLS.update(cpu=native_cpu_task, mixed=native_mixed_task)
+
+_TASK_FUNCS = {**_PY_IMPLS, **_NATIVE_IMPLS}
+_DEFAULT_TASK_FUNC = _TASK_FUNCS['cpu']
+
 def get_task_function(task_type: str) -> Callable:
-    """Returns the appropriate task function based on task type."""
-    task_functions = {
-        'io': io_task,
-        'cpu': cpu_task,
-        'mixed': mixed_task
-    }
-    return task_functions.get(task_type, cpu_task)  # Default to CPU task if unknown type
-
-def generate_random_task(task_id: int) -> Task:
+    """Returns the appropriate task function based on task type.
+    
+    A native implementation is preferred over the pure-Python one when available.
+    Task functions may run concurrently in threads (see worker.make_worker), so
+    they must be thread-safe.
+    """
+    return _TASK_FUNCS.get(task_type, _DEFAULT_TASK_FUNC)  # Default to CPU task if unknown type
+
+# Shared default generator, created on first use
+_rng = None
+
+def _default_rng():
+    """Return the module's random generator, creating it on first use."""
+    global _rng
+    if _rng is None:
+        # Imported here so worker processes that only execute tasks don't load NumPy
+        import numpy as np
+        _rng = np.random.default_rng()
+    return _rng
+
+def generate_random_task(task_id: int, rng=None) -> Task:
     """Generate a random task for testing."""
+    return generate_random_tasks(1, task_id, rng=rng)[0]
+
+def generate_random_tasks(num_tasks: int, start_id: int = 1, rng=None,
+                          pool: Optional[TaskPool] = None) -> List[Task]:
+    """Generate a batch of random tasks, drawing all random parameters at once.
+    
+    Tasks are taken from ``pool`` when one is given.
+    """
+    if rng is None:
+        rng = _default_rng()
+    
+    make_task = pool.acquire if pool is not None else Task
     task_types = ['io', 'cpu', 'mixed']
-    task_type = random.choice(task_types)
-    
-    payload = {}
-    if task_type == 'io':
-        payload = {
-            'filename': f"file_{task_id}.txt",
-            'content': f"Content for task {task_id}",
-            'size': random.randint(512, 2048)
-        }
-    elif task_type == 'cpu':
-        payload = {
-            'iterations': random.randint(100000, 1000000),
-            'complexity': random.randint(1, 2)
-        }
-    else:  # mixed
-        payload = {
-            'filename': f"mixed_{task_id}.txt",
-            'iterations': random.randint(50000, 500000),
-            'complexity': random.randint(1, 2),
-            'size': random.randint(256, 1024)
-        }
-    
-    return Task(id=task_id, task_type=task_type, payload=payload)
\ No newline at end of file
+    types = rng.integers(0, 3, num_tasks).tolist()
+    io_sizes = rng.integers(512, 2049, num_tasks).tolist()
+    cpu_iterations = rng.integers(100000, 1000001, num_tasks).tolist()
+    mixed_iterations = rng.integers(50000, 500001, num_tasks).tolist()
+    mixed_sizes = rng.integers(256, 1025, num_tasks).tolist()
+    complexities = rng.integers(1, 3, num_tasks).tolist()
+    
+    tasks = []
+    for i in range(num_tasks):
+        task_id = start_id + i
+        task_type = task_types[types[i]]
+        if task_type == 'io':
+            task = make_task(
+                id=task_id,
+                task_type=task_type,
+                filename=f"file_{task_id}.txt",
+                content=f"Content for task {task_id}",
+                size=io_sizes[i]
+            )
+        elif task_type == 'cpu':
+            task = make_task(
+                id=task_id,
+                task_type=task_type,
+                iterations=cpu_iterations[i],
+                complexity=complexities[i]
+            )
+        else:  # mixed
+            task = make_task(
+                id=task_id,
+                task_type=task_type,
+                filename=f"mixed_{task_id}.txt",
+                iterations=mixed_iterations[i],
+                complexity=complexities[i],
+                size=mixed_sizes[i]
+            )
+        tasks.append(task)
+    
+    return tasks
\ No newline at end of file
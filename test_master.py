@@ -0,0 +1,71 @@
+"""
+Tests for the master implementations of the HTTP server simulation.
+"""
+
+import logging
+import threading
+import unittest
+
+from master import MultiprocessMaster, configure_start_method
+from task import Task
+
+def setUpModule():
+    configure_start_method()
+    logging.disable(logging.INFO)
+
+def tearDownModule():
+    logging.disable(logging.NOTSET)
+
+class MultiprocessMasterTest(unittest.TestCase):
+    """Tests for MultiprocessMaster over the shared-memory rings."""
+    
+    def run_with_timeout(self, target, timeout=120.0):
+        """Run target in a thread and fail if it doesn't finish in time, e.g. on a deadlock."""
+        outcome = {}
+        
+        def run():
+            try:
+                outcome['result'] = target()
+            except BaseException as e:
+                outcome['error'] = e
+        
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(timeout)
+        self.assertFalse(thread.is_alive(), f"Did not finish within {timeout} seconds")
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['result']
+    
+    def test_workload_larger_than_both_rings(self):
+        master = MultiprocessMaster(num_workers=2)
+        if master.use_threads:
+            self.skipTest("Thread workers use unbounded queues")
+        capacity = master.task_queue.capacity
+        num_tasks = 2 * capacity * master.max_batch_size + 500
+        
+        def run_workload():
+            master.start_workers()
+            master.performance.start()
+            try:
+                for i in range(num_tasks):
+                    master.submit_task(Task(i, 'cpu', iterations=1, complexity=1))
+                master.flush_tasks()
+                return master.wait_for_completion()
+            finally:
+                master.stop_workers()
+        
+        results = self.run_with_timeout(run_workload)
+        self.assertEqual(master.tasks_completed, num_tasks)
+        self.assertEqual(sorted(task.id for task in results), list(range(num_tasks)))
+        
+    def test_run_benchmark_twice(self):
+        master = MultiprocessMaster(num_workers=2)
+        for _ in range(2):
+            result = self.run_with_timeout(lambda: master.run_benchmark(20))
+            self.assertEqual(result['num_tasks'], 20)
+            self.assertEqual(master.tasks_completed, 20)
+        self.assertFalse(master.running)
+
+if __name__ == '__main__':
+    unittest.main()
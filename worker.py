@@ -4,110 +4,342 @@ Worker implementation for the HTTP server simulation.
 
 import time
 import os
+import sys
 from multiprocessing import Process
 from threading import Thread
 import queue
+import pickle
 import signal
+from typing import List
 
 from logger import Logger
-from task import Task, get_task_function
+from task import Task
+
+# Bound once so the per-task timing calls skip the attribute lookup
+_perf_counter_ns = time.perf_counter_ns
+
+# Set by SIGINT in a process worker; the worker then finishes the tasks already
+# queued without waiting for more, and exits once the queue is empty
+_shutdown_requested = False
+
+def _request_shutdown(signum, frame):
+    """SIGINT handler for process workers: drain the queued tasks, then stop."""
+    global _shutdown_requested
+    _shutdown_requested = True
+
+def run_task_batch(tasks: List[Task], logger: Logger) -> List[Task]:
+    """Execute tasks in the calling thread and record each one's result and processing time.
+    
+    The logger and clock lookups and the log-level check are done once per batch.
+    """
+    info = logger.info if logger.info_enabled() else None
+    perf_counter_ns = _perf_counter_ns
+    
+    for task in tasks:
+        if info:
+            info("Starting task %s (%s)", task.id, task.task_type)
+        # Monotonic integer clock: immune to wall-clock adjustments and float rounding
+        start_ns = perf_counter_ns()
+        
+        try:
+            # Execute the task with the function resolved when it was created
+            task.result = task.func(task)
+        except Exception as e:
+            task.processing_time = (perf_counter_ns() - start_ns) * 1e-9
+            logger.error("Error processing task %s: %s", task.id, e)
+            # Stringified only if a consumer renders it. The traceback is dropped, as its
+            # frames reference the tasks and would make every failure a reference cycle
+            task.result = e.with_traceback(None)
+            continue
+            
+        task.processing_time = (perf_counter_ns() - start_ns) * 1e-9
+        if info:
+            info("Completed task %s in %.3fs", task.id, task.processing_time)
+            
+    return tasks
+
+def run_task(task: Task, logger: Logger) -> Task:
+    """Execute a single task in the calling thread - a batch of one for run_task_batch."""
+    return run_task_batch([task], logger)[0]
 
 class Worker:
-    """Base worker class for processing tasks."""
+    """Base worker class for processing tasks.
+    
+    A worker owns the thread or process that runs its loop rather than being one,
+    which lets it use ``__slots__``. Subclasses create that runner in _create_runner.
+    """
+    
+    __slots__ = ("worker_id", "task_queue", "result_queue", "worker_type", "logger", "_runner")
     
     def __init__(self, worker_id, task_queue, result_queue, worker_type="base"):
         self.worker_id = worker_id
         self.task_queue = task_queue
         self.result_queue = result_queue
-        self.running = True
         self.worker_type = worker_type
         self.logger = Logger(f"{worker_type}.worker.{worker_id}")
+        self._runner = None
         
-    def process_task(self, task):
-        """Process a single task and return the result."""
-        self.logger.info(f"Starting task {task.id} ({task.task_type})")
-        start_time = time.time()
+    def __getstate__(self):
+        # Collect the slots of every class in the hierarchy; the runner handle
+        # stays with the process that started it
+        return {
+            name: getattr(self, name)
+            for cls in type(self).__mro__
+            for name in getattr(cls, "__slots__", ())
+            if name != "_runner"
+        }
         
-        try:
-            # Get the appropriate function for the task type
-            task_func = get_task_function(task.task_type)
-            
-            # Execute the task
-            result = task_func(task.payload)
-            
-            # Update task with result and processing time
-            task.result = result
-            task.processing_time = time.time() - start_time
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._runner = None
+        
+    def _create_runner(self):
+        """Create the thread or process that will execute run()."""
+        raise NotImplementedError("Subclasses must implement _create_runner")
+        
+    def run(self):
+        """Main worker loop: drain task batches and return their results until a poison pill arrives."""
+        label = self.worker_type.capitalize()
+        self._on_start()
+        self.logger.info(f"{label} worker {self.worker_id} started (PID: {os.getpid()})")
+        
+        # Bind the per-batch lookups to locals once
+        drain = self._drain
+        put = self._put_results
+        process_batch = self.process_batch
+        batch_done = self._batch_done
+        interrupted = self._interrupted
+        block = True
+        
+        while True:
+            # Task errors are caught per task, so the steady-state loop needs no
+            # try of its own; this one only restarts the loop after a queue failure
+            try:
+                while True:
+                    tasks, stop = drain(block)
+                    
+                    if tasks:
+                        # One put per batch; results are never held across the blocking get
+                        put(process_batch(tasks))
+                        batch_done(tasks)
+                        
+                    if stop:  # Poison pill, or the queue ran dry after SIGINT
+                        break
+                        
+                    # After SIGINT, keep taking the tasks already queued so none are
+                    # orphaned, but stop waiting for new ones
+                    block = not interrupted()
+                        
+                self.logger.info(f"{label} worker {self.worker_id} received shutdown signal")
+                break
+                
+            except Exception as e:
+                self.logger.error(f"Unexpected error in worker: {str(e)}")
+                
+        self.logger.info(f"{label} worker {self.worker_id} stopped")
+        
+    def _on_start(self):
+        """Prepare the thread or process the loop runs in - no-op by default."""
+        pass
+        
+    def _put_results(self, tasks):
+        """Send a batch of processed tasks back to the master."""
+        self.result_queue.put(tasks)
+        
+    def _batch_done(self, tasks):
+        """Acknowledge a delivered batch on the task queue - no-op by default."""
+        pass
+        
+    def _interrupted(self) -> bool:
+        """Return whether the loop should drain the queued tasks and stop without waiting for a poison pill."""
+        return False
+        
+    def start(self):
+        """Start the worker loop in a new thread or process."""
+        self._runner = self._create_runner()
+        self._runner.start()
+        
+    def join(self, timeout=None):
+        """Wait for the worker loop to finish."""
+        if self._runner is not None:
+            self._runner.join(timeout)
             
-            self.logger.info(f"Completed task {task.id} in {task.processing_time:.3f}s")
-            return task
+    def is_alive(self) -> bool:
+        """Return whether the worker loop is still running."""
+        return self._runner is not None and self._runner.is_alive()
+        
+    def terminate(self):
+        """Force the worker loop to end - only processes can be; a daemon thread is left to exit with the program."""
+        pass
+        
+    def process_batch(self, tasks):
+        """Process a batch of tasks in place and return them."""
+        return run_task_batch(tasks, self.logger)
             
-        except Exception as e:
-            self.logger.error(f"Error processing task {task.id}: {str(e)}")
-            task.result = f"Error: {str(e)}"
-            task.processing_time = time.time() - start_time
-            return task
+    def _drain(self, block=True):
+        """Take the next task, waiting for one only if ``block`` is set.
+        
+        Returns the tasks and whether to stop: a poison pill was received, or
+        the queue was empty on a non-blocking drain.
+        """
+        try:
+            task = self.task_queue.get(block)
+        except queue.Empty:
+            return [], True
+        if task is None:
+            return [], True
+        return [task], False
             
-    def stop(self):
-        """Stop the worker."""
-        self.running = False
+    def stop(self, timeout=None):
+        """Stop the worker once it reaches a poison pill queued behind the pending tasks.
+        
+        The pill is the only stop signal, so each worker consumes exactly one and a
+        shared queue is left without stale pills. Raises queue.Full if a bounded
+        queue has no room for the pill within ``timeout``.
+        """
+        self.task_queue.put(None, timeout=timeout)
 
-class ThreadWorker(Worker, Thread):
+class ThreadWorker(Worker):
     """Worker implementation using threads."""
     
-    def __init__(self, worker_id, task_queue, result_queue):
-        Worker.__init__(self, worker_id, task_queue, result_queue, "thread")
-        Thread.__init__(self, daemon=True)
+    __slots__ = ("num_workers",)
+    
+    def __init__(self, worker_id, task_queue, result_queue, num_workers=1):
+        super().__init__(worker_id, task_queue, result_queue, "thread")
+        self.num_workers = num_workers  # Workers sharing the task queue
         
-    def run(self):
-        """Main worker loop for processing tasks from the queue."""
-        self.logger.info(f"Thread worker {self.worker_id} started")
+    def _drain(self, block=True, max_n=16):
+        """Take one task, then more that are already queued, up to a fair share.
         
-        while self.running:
+        Each worker takes at most its share of the queued tasks (and never more than
+        ``max_n``), so the first worker to wake can't take the whole workload while
+        the others stay idle. Returns the tasks and whether to stop.
+        """
+        try:
+            item = self.task_queue.get(block)
+        except queue.Empty:
+            return [], True
+        if item is None:
+            return [], True
+        tasks = [item]
+        limit = min(max_n, max(1, (self.task_queue.qsize() + 1) // self.num_workers))
+        while len(tasks) < limit:
             try:
-                task = self.task_queue.get(timeout=0.5)
-                if task is None:  # Poison pill
-                    self.logger.info(f"Thread worker {self.worker_id} received shutdown signal")
-                    break
-                
-                processed_task = self.process_task(task)
-                self.result_queue.put(processed_task)
-                self.task_queue.task_done()
-                
+                item = self.task_queue.get_nowait()
             except queue.Empty:
-                continue
-            except Exception as e:
-                self.logger.error(f"Unexpected error in worker: {str(e)}")
-                
-        self.logger.info(f"Thread worker {self.worker_id} stopped")
+                break
+            if item is None:
+                return tasks, True
+            tasks.append(item)
+        return tasks, False
+        
+    def _create_runner(self):
+        return Thread(target=self.run, name=f"thread.worker.{self.worker_id}", daemon=True)
+        
+    def _batch_done(self, tasks):
+        task_done = self.task_queue.task_done
+        for _ in tasks:
+            task_done()
 
-class ProcessWorker(Worker, Process):
+class ProcessWorker(Worker):
     """Worker implementation using processes."""
     
+    __slots__ = ()
+    
     def __init__(self, worker_id, task_queue, result_queue):
-        Worker.__init__(self, worker_id, task_queue, result_queue, "process")
-        Process.__init__(self, daemon=True)
+        super().__init__(worker_id, task_queue, result_queue, "process")
         
-    def run(self):
-        """Main worker loop for processing tasks from the queue."""
-        # Setup signal handlers for graceful shutdown
-        signal.signal(signal.SIGINT, signal.SIG_IGN)
+    def _create_runner(self):
+        return Process(target=self.run, name=f"process.worker.{self.worker_id}", daemon=True)
         
-        self.logger.info(f"Process worker {self.worker_id} started (PID: {os.getpid()})")
+    @property
+    def pid(self):
+        """PID of the worker process, or None if it hasn't been started."""
+        return self._runner.pid if self._runner is not None else None
         
-        while self.running:
-            try:
-                task = self.task_queue.get(timeout=0.5)
-                if task is None:  # Poison pill
-                    self.logger.info(f"Process worker {self.worker_id} received shutdown signal")
-                    break
-                
-                processed_task = self.process_task(task)
-                self.result_queue.put(processed_task)
-                
-            except queue.Empty:
-                continue
-            except Exception as e:
-                self.logger.error(f"Unexpected error in worker: {str(e)}")
-                
-        self.logger.info(f"Process worker {self.worker_id} stopped")
\ No newline at end of file
+    def terminate(self, timeout=1.0):
+        """Kill the worker process, with SIGKILL if it is still alive after SIGTERM and ``timeout``."""
+        if self._runner is None:
+            return
+        self._runner.terminate()
+        self._runner.join(timeout)
+        if self._runner.is_alive():
+            self._runner.kill()
+            self._runner.join()
+        
+    def _pin_to_cpu(self):
+        """Pin this process to one of the cores it may run on, spreading workers by ID."""
+        try:
+            cpus = sorted(os.sched_getaffinity(0))
+            os.sched_setaffinity(0, {cpus[(self.worker_id - 1) % len(cpus)]})
+        except (AttributeError, OSError):  # Not available on macOS/Windows
+            pass
+            
+    def _put_results(self, tasks):
+        """Send a batch of results with one put, splitting it only if it overflows a slot.
+        
+        Task errors that can't be pickled are replaced by a RuntimeError of their repr.
+        """
+        try:
+            self.result_queue.put(tasks)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # A task error that can't be pickled: send its repr instead. This is only
+            # checked here, where the batch is pickled anyway, rather than per error;
+            # a plain RuntimeError of a repr always pickles, so it isn't replaced again
+            errors = [task for task in tasks if isinstance(task.result, BaseException)
+                      and type(task.result) is not RuntimeError]
+            if not errors:
+                raise
+            for task in errors:
+                task.result = RuntimeError(repr(task.result))
+            self._put_results(tasks)
+        except ValueError:  # Pickled batch is larger than a ring slot
+            if len(tasks) == 1:
+                # Dropping the task would leave the master waiting for it forever,
+                # so report the failure in place of the result
+                task = tasks[0]
+                self.logger.error(f"Result of task {task.id} is too large for a ring slot")
+                task.result = RuntimeError(f"Result of task {task.id} too large for a ring slot")
+                self.result_queue.put(tasks)
+                return
+            middle = len(tasks) // 2
+            self._put_results(tasks[:middle])
+            self._put_results(tasks[middle:])
+            
+    def _drain(self, block=True):
+        """Take the next batch of tasks sent by the master.
+        
+        The master already batches submissions, so each get() yields one batch.
+        """
+        try:
+            tasks = self.task_queue.get(block)
+        except queue.Empty:
+            return [], True
+        if tasks is None:
+            return [], True
+        return tasks, False
+        
+    def _on_start(self):
+        # Setup signal handlers for graceful shutdown
+        signal.signal(signal.SIGINT, _request_shutdown)
+        self._pin_to_cpu()
+        
+    def _interrupted(self) -> bool:
+        return _shutdown_requested
+
+def gil_enabled() -> bool:
+    """Return False when running on a free-threaded interpreter with the GIL disabled."""
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)  # Python 3.13+
+    return is_gil_enabled is None or is_gil_enabled()
+
+def make_worker(worker_id, task_queue, result_queue, num_workers=1):
+    """Create a parallel worker suited to the running interpreter.
+    
+    Without a GIL, threads run CPU-bound tasks in parallel, so a ThreadWorker
+    avoids the pickling and IPC a ProcessWorker pays for. The task functions
+    then run concurrently in one process and must be thread-safe.
+    """
+    if not gil_enabled():
+        return ThreadWorker(worker_id, task_queue, result_queue, num_workers)
+    return ProcessWorker(worker_id, task_queue, result_queue)
\ No newline at end of file